@@ -1,6 +1,6 @@
 """Sine backend configuration — loaded from environment / .env file."""
 
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
 
 
@@ -10,10 +10,17 @@ class Settings(BaseSettings):
     aws_secret_access_key: str = ""
     aws_region: str = "us-east-1"
     s3_bucket_name: str = "sine-videos"
+    # Threads (and pooled S3 connections) available to blocking boto3 calls
+    s3_max_workers: int = 32
+    # Of those, how many may run upload_part at once; kept below
+    # s3_max_workers so initiate/complete/abort always find a free thread
+    s3_max_part_uploads: int = 24
 
     # Database
     mongodb_url: str = "mongodb://localhost:27017"
     mongodb_db_name: str = "sine"
+    mongodb_max_pool_size: int = 20
+    mongodb_min_pool_size: int = 2
 
     # Server
     host: str = "0.0.0.0"
@@ -23,7 +30,13 @@ class Settings(BaseSettings):
     # Presigned URL
     presigned_url_expiry: int = 3600
 
-    model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
+    # Recordings with no chunk or part-ack for this long are aborted by the sweeper
+    stale_upload_timeout: int = 6 * 3600
+    stale_upload_sweep_interval: int = 600
+
+    model_config = SettingsConfigDict(
+        env_file=".env", env_file_encoding="utf-8", frozen=True
+    )
 
 
 @lru_cache()
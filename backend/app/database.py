@@ -5,19 +5,33 @@ from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from app.config import get_settings
 
 _client: AsyncIOMotorClient | None = None
+_database: AsyncIOMotorDatabase | None = None
 
 
 def get_client() -> AsyncIOMotorClient:
     global _client
     if _client is None:
         settings = get_settings()
-        _client = AsyncIOMotorClient(settings.mongodb_url)
+        _client = AsyncIOMotorClient(
+            settings.mongodb_url,
+            # Store uuid.UUID values as BSON Binary subtype 4 (16 bytes) rather
+            # than 36-char strings — smaller index keys and cheaper matches.
+            uuidRepresentation="standard",
+            # Keep a few connections warm and recycle idle ones before
+            # server-side / proxy idle timeouts drop them mid-request.
+            maxPoolSize=settings.mongodb_max_pool_size,
+            minPoolSize=settings.mongodb_min_pool_size,
+            maxIdleTimeMS=1_800_000,
+            waitQueueTimeoutMS=30_000,
+        )
     return _client
 
 
 def get_database() -> AsyncIOMotorDatabase:
-    settings = get_settings()
-    return get_client()[settings.mongodb_db_name]
+    global _database
+    if _database is None:
+        _database = get_client()[get_settings().mongodb_db_name]
+    return _database
 
 
 def get_db() -> AsyncIOMotorDatabase:
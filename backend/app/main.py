@@ -1,39 +1,98 @@
 """Sine — FastAPI application entry point."""
 
-from contextlib import asynccontextmanager
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+from datetime import timedelta
 
 from fastapi import FastAPI
+from fastapi.datastructures import Default
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pymongo.errors import OperationFailure
 
 from app.config import get_settings
 from app.database import get_database
 from app.models import ANNOTATIONS_COLLECTION, SCENE_MARKERS_COLLECTION, VIDEOS_COLLECTION
 from app.routers import annotations, markers, video, ws
+from app.s3 import warm_up
+
+logger = logging.getLogger(__name__)
+
+
+async def _sweep_stale_uploads() -> None:
+    """Periodically abort uploads whose client went away without /abort."""
+    db = get_database()
+    older_than = timedelta(seconds=settings.stale_upload_timeout)
+    while True:
+        await asyncio.sleep(settings.stale_upload_sweep_interval)
+        try:
+            await video.abort_stale_uploads(db, older_than)
+        except Exception:
+            logger.exception("Stale upload sweep failed")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Ensure MongoDB indexes exist on startup."""
+    """Ensure indexes exist, warm clients, and run the stale-upload sweeper."""
     db = get_database()
-    await db[VIDEOS_COLLECTION].create_index("s3_key", unique=True, sparse=True)
+    videos = db[VIDEOS_COLLECTION]
+    # s3_key must be unique only where it is set. A sparse index still holds
+    # explicit nulls, so replace any older sparse variant — Mongo rejects a
+    # same-named index with different options. Workers start together, so
+    # another one may have dropped it already.
+    if (await videos.index_information()).get("s3_key_1", {}).get("sparse"):
+        with suppress(OperationFailure):
+            await videos.drop_index("s3_key_1")
+    await videos.create_index(
+        "s3_key",
+        unique=True,
+        partialFilterExpression={"s3_key": {"$type": "string"}},
+    )
+    # list_videos sorts newest-first; the stale-upload sweep scans by status +
+    # last activity (falling back to age for documents that predate it)
+    await videos.create_index([("created_at", -1)])
+    await videos.create_index([("status", 1), ("last_activity_at", 1)])
+    await videos.create_index([("status", 1), ("created_at", -1)])
     await db[ANNOTATIONS_COLLECTION].create_index([("video_id", 1), ("timestamp", 1)])
-    await db[SCENE_MARKERS_COLLECTION].create_index([("video_id", 1), ("order", 1)])
+    await db[SCENE_MARKERS_COLLECTION].create_index([("video_id", 1), ("timestamp", 1)])
+    # The index builds above already opened a pooled Mongo connection; do the
+    # same for S3 so the first upload doesn't load botocore's service model.
+    warm_up()
+
+    sweeper = asyncio.create_task(_sweep_stale_uploads())
     yield
+    sweeper.cancel()
+    with suppress(asyncio.CancelledError):
+        await sweeper
 
 
 settings = get_settings()
 
+CORS_ORIGINS = tuple(o.strip() for o in settings.cors_origins.split(",") if o.strip())
+
+# Older FastAPI encodes responses with the stdlib json module, where orjson is
+# a cheap win. Releases that deprecate ORJSONResponse dump response models to
+# JSON bytes in pydantic-core instead, but only while the response class is
+# left at its default, so keep the default on those.
+DEFAULT_RESPONSE_CLASS = (
+    Default(JSONResponse)
+    if hasattr(ORJSONResponse, "__deprecated__")
+    else ORJSONResponse
+)
+
 app = FastAPI(
     title="Sine — VideoFlow API",
     description="Intelligent video capture with QUIC-ready transport, AV1 encoding, metadata trimming, and context-aware scene markers.",
     version="2.0.0",
     lifespan=lifespan,
+    default_response_class=DEFAULT_RESPONSE_CLASS,
 )
 
 # CORS — allow the Next.js frontend
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.cors_origins.split(","),
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
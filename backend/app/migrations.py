@@ -0,0 +1,133 @@
+"""
+One-off data migrations — run once per deploy, before the API workers start.
+
+    python -m app.migrations
+
+Every step is idempotent and is recorded in the ``schema_migrations``
+collection once it has finished, so re-running only applies new steps.
+start.sh / start.ps1 run this ahead of uvicorn; it is deliberately not part
+of the app lifespan, where several workers would race through it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from app.database import get_database
+from app.models import (
+    ANNOTATIONS_COLLECTION,
+    SCENE_MARKERS_COLLECTION,
+    VIDEOS_COLLECTION,
+)
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_COLLECTION = "schema_migrations"
+
+
+async def convert_string_ids(db: AsyncIOMotorDatabase) -> None:
+    """Rewrite string video ids as BSON UUIDs (Binary subtype 4).
+
+    Videos used to be keyed by ``str(uuid)``, with annotations and markers
+    pointing at them the same way; the routers now query with uuid.UUID, so
+    string-keyed data would 404. ``$toUUID`` needs MongoDB 8, so documents
+    are converted client-side. An ``_id`` can't be changed in place: each
+    video is re-inserted under its UUID (carrying marker_seq, parts and all
+    other fields along) and the string-keyed original is then deleted.
+    Re-running after an interruption picks up where it stopped.
+    """
+    videos = db[VIDEOS_COLLECTION]
+    # The re-inserted copy briefly shares its s3_key with the original, so
+    # drop the unique index; app startup recreates it.
+    try:
+        await videos.drop_index("s3_key_1")
+    except OperationFailure:
+        pass  # already gone
+
+    async for doc in videos.find({"_id": {"$type": "string"}}):
+        old_id = doc["_id"]
+        try:
+            doc["_id"] = uuid.UUID(old_id)
+        except ValueError:
+            logger.warning("Leaving video with non-UUID id %r unconverted", old_id)
+            continue
+        try:
+            await videos.insert_one(doc)
+        except DuplicateKeyError:
+            pass  # copied by an earlier, interrupted run
+        await videos.delete_one({"_id": old_id})
+
+    for name in (ANNOTATIONS_COLLECTION, SCENE_MARKERS_COLLECTION):
+        collection = db[name]
+        for old_id in await collection.distinct(
+            "video_id", {"video_id": {"$type": "string"}}
+        ):
+            try:
+                new_id = uuid.UUID(old_id)
+            except ValueError:
+                continue
+            await collection.update_many(
+                {"video_id": old_id}, {"$set": {"video_id": new_id}}
+            )
+
+
+async def backfill_marker_seq(db: AsyncIOMotorDatabase) -> None:
+    """Seed each video's marker_seq counter from the markers it already has.
+
+    Marker orders are claimed with ``$inc`` on marker_seq; a video whose
+    markers predate the counter would otherwise restart at 0 and collide.
+    ``$max`` never lowers a counter that has already moved on.
+    """
+    cursor = db[SCENE_MARKERS_COLLECTION].aggregate([
+        {"$group": {"_id": "$video_id", "max_order": {"$max": "$order"}}},
+    ])
+    async for row in cursor:
+        if row["max_order"] is None:
+            continue
+        await db[VIDEOS_COLLECTION].update_one(
+            {"_id": row["_id"]},
+            {"$max": {"marker_seq": row["max_order"] + 1}},
+        )
+
+
+# Applied in this order; names are the schema_migrations keys, never rename.
+MIGRATIONS: list[tuple[str, Callable[[AsyncIOMotorDatabase], Awaitable[None]]]] = [
+    ("convert_string_ids", convert_string_ids),
+    ("backfill_marker_seq", backfill_marker_seq),
+]
+
+
+async def run_migrations(db: AsyncIOMotorDatabase) -> list[str]:
+    """Apply pending migrations in order; returns the names applied."""
+    done = {
+        doc["_id"]
+        async for doc in db[MIGRATIONS_COLLECTION].find({}, {"_id": 1})
+    }
+    applied = []
+    for name, migrate in MIGRATIONS:
+        if name in done:
+            continue
+        logger.info("Applying migration %s", name)
+        await migrate(db)
+        await db[MIGRATIONS_COLLECTION].insert_one(
+            {"_id": name, "applied_at": datetime.now(timezone.utc)}
+        )
+        applied.append(name)
+    return applied
+
+
+async def _main() -> None:
+    applied = await run_migrations(get_database())
+    print(f"Applied: {', '.join(applied)}" if applied else "Database is up to date")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
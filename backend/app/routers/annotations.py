@@ -12,62 +12,69 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.database import get_db
 from app.models import ANNOTATIONS_COLLECTION, VIDEOS_COLLECTION
 from app.schemas import AnnotationCreate, AnnotationResponse
+from app.streaming import json_array_response
 
 router = APIRouter(prefix="/annotations", tags=["annotations"])
 
+DB = Depends(get_db)
+
+
+def _doc_fields(doc: dict) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "video_id": doc["video_id"],
+        "timestamp": doc["timestamp"],
+        "content": doc.get("content"),
+        "type": doc.get("type", "comment"),
+        "created_at": doc["created_at"],
+    }
+
 
 def _doc_to_response(doc: dict) -> AnnotationResponse:
-    return AnnotationResponse(
-        id=str(doc["_id"]),
-        video_id=uuid.UUID(doc["video_id"]),
-        timestamp=doc["timestamp"],
-        content=doc.get("content"),
-        type=doc.get("type", "comment"),
-        created_at=doc["created_at"],
-    )
+    return AnnotationResponse(**_doc_fields(doc))
 
 
 @router.post("/", response_model=AnnotationResponse, status_code=201)
 async def create_annotation(
     body: AnnotationCreate,
-    db: AsyncIOMotorDatabase = Depends(get_db),
+    db: AsyncIOMotorDatabase = DB,
 ):
     """Add a comment / annotation at a specific timestamp in a video."""
-    video = await db[VIDEOS_COLLECTION].find_one({"_id": str(body.video_id)})
+    # No FK constraints in Mongo, so the existence check stays — but only the key comes back
+    video = await db[VIDEOS_COLLECTION].find_one({"_id": body.video_id}, {"_id": 1})
     if video is None:
         raise HTTPException(404, "Video not found")
 
     doc = {
-        "video_id": str(body.video_id),
+        "video_id": body.video_id,
         "timestamp": body.timestamp,
         "content": body.content,
         "type": body.type,
         "created_at": datetime.now(timezone.utc),
     }
-    result = await db[ANNOTATIONS_COLLECTION].insert_one(doc)
-    created = await db[ANNOTATIONS_COLLECTION].find_one({"_id": result.inserted_id})
-    return _doc_to_response(created)
+    # insert_one sets doc["_id"]; no need to read the document back
+    await db[ANNOTATIONS_COLLECTION].insert_one(doc)
+    return _doc_to_response(doc)
 
 
 @router.get("/video/{video_id}", response_model=list[AnnotationResponse])
 async def list_annotations(
     video_id: uuid.UUID,
-    db: AsyncIOMotorDatabase = Depends(get_db),
+    db: AsyncIOMotorDatabase = DB,
 ):
     """Get all annotations for a video, ordered by timestamp."""
     cursor = (
         db[ANNOTATIONS_COLLECTION]
-        .find({"video_id": str(video_id)})
+        .find({"video_id": video_id})
         .sort("timestamp", 1)
     )
-    docs = await cursor.to_list(length=None)
-    return [_doc_to_response(d) for d in docs]
+    return json_array_response(cursor, _doc_fields)
 
 
 @router.delete("/{annotation_id}", status_code=204)
 async def delete_annotation(
     annotation_id: str,
-    db: AsyncIOMotorDatabase = Depends(get_db),
+    db: AsyncIOMotorDatabase = DB,
 ):
     """Delete a single annotation."""
     try:
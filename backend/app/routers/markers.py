@@ -14,6 +14,7 @@ from datetime import datetime, timezone
 from bson import ObjectId
 from fastapi import APIRouter, Depends, HTTPException
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
 
 from app.database import get_db
 from app.models import SCENE_MARKERS_COLLECTION, VIDEOS_COLLECTION
@@ -22,104 +23,114 @@ from app.schemas import (
     SceneMarkerCreate,
     SceneMarkerResponse,
 )
+from app.streaming import json_array_response
 
 router = APIRouter(prefix="/markers", tags=["markers"])
 
+DB = Depends(get_db)
+
+
+def _doc_fields(doc: dict) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "video_id": doc["video_id"],
+        # Streamed lists skip response_model, and WebSocket markers stored
+        # before they were validated may hold an int timestamp or null label
+        "timestamp": float(doc["timestamp"]),
+        "label": doc["label"] if doc.get("label") is not None else "Scene change",
+        "source": doc.get("source", "focus_switch"),
+        "order": doc.get("order", 0),
+        "created_at": doc["created_at"],
+    }
+
 
 def _doc_to_response(doc: dict) -> SceneMarkerResponse:
-    return SceneMarkerResponse(
-        id=str(doc["_id"]),
-        video_id=uuid.UUID(doc["video_id"]),
-        timestamp=doc["timestamp"],
-        label=doc["label"],
-        source=doc.get("source", "focus_switch"),
-        order=doc.get("order", 0),
-        created_at=doc["created_at"],
-    )
+    return SceneMarkerResponse(**_doc_fields(doc))
 
 
 @router.post("/", response_model=SceneMarkerResponse, status_code=201)
 async def create_marker(
     data: SceneMarkerCreate,
-    db: AsyncIOMotorDatabase = Depends(get_db),
+    db: AsyncIOMotorDatabase = DB,
 ):
     """Create a single scene marker during or after recording."""
-    video = await db[VIDEOS_COLLECTION].find_one({"_id": str(data.video_id)})
+    # Claim the next order from the per-video counter; doubles as the
+    # existence check and can't hand the same order to concurrent creates.
+    video = await db[VIDEOS_COLLECTION].find_one_and_update(
+        {"_id": data.video_id},
+        {"$inc": {"marker_seq": 1}},
+        projection={"marker_seq": 1},
+        return_document=ReturnDocument.AFTER,
+    )
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
-
-    last = await (
-        db[SCENE_MARKERS_COLLECTION]
-        .find({"video_id": str(data.video_id)})
-        .sort("order", -1)
-        .limit(1)
-        .to_list(length=1)
-    )
-    next_order = (last[0]["order"] + 1) if last else 0
+    next_order = video["marker_seq"] - 1
 
     doc = {
-        "video_id": str(data.video_id),
+        "video_id": data.video_id,
         "timestamp": data.timestamp,
         "label": data.label,
         "source": data.source,
         "order": next_order,
         "created_at": datetime.now(timezone.utc),
     }
-    result = await db[SCENE_MARKERS_COLLECTION].insert_one(doc)
-    created = await db[SCENE_MARKERS_COLLECTION].find_one({"_id": result.inserted_id})
-    return _doc_to_response(created)
+    await db[SCENE_MARKERS_COLLECTION].insert_one(doc)
+    return _doc_to_response(doc)
 
 
 @router.post("/batch", response_model=list[SceneMarkerResponse], status_code=201)
 async def create_markers_batch(
     data: SceneMarkerBatchCreate,
-    db: AsyncIOMotorDatabase = Depends(get_db),
+    db: AsyncIOMotorDatabase = DB,
 ):
     """Batch-create scene markers — typically called when recording ends."""
-    video = await db[VIDEOS_COLLECTION].find_one({"_id": str(data.video_id)})
+    count = len(data.markers)
+    video = await db[VIDEOS_COLLECTION].find_one_and_update(
+        {"_id": data.video_id},
+        {"$inc": {"marker_seq": count}},
+        projection={"marker_seq": 1},
+        return_document=ReturnDocument.AFTER,
+    )
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
+    first_order = video["marker_seq"] - count
 
+    now = datetime.now(timezone.utc)
     docs = [
         {
-            "video_id": str(data.video_id),
+            "video_id": data.video_id,
             "timestamp": m.timestamp,
             "label": m.label,
             "source": m.source,
-            "order": i,
-            "created_at": datetime.now(timezone.utc),
+            "order": first_order + i,
+            "created_at": now,
         }
         for i, m in enumerate(data.markers)
     ]
-    result = await db[SCENE_MARKERS_COLLECTION].insert_many(docs)
-    created = await (
-        db[SCENE_MARKERS_COLLECTION]
-        .find({"_id": {"$in": result.inserted_ids}})
-        .sort("order", 1)
-        .to_list(length=None)
-    )
-    return [_doc_to_response(d) for d in created]
+    # insert_many fills in each doc's _id, and docs are already in order.
+    # Unordered lets the server apply the inserts without serialising them.
+    await db[SCENE_MARKERS_COLLECTION].insert_many(docs, ordered=False)
+    return [_doc_fields(d) for d in docs]
 
 
 @router.get("/video/{video_id}", response_model=list[SceneMarkerResponse])
 async def list_markers(
     video_id: uuid.UUID,
-    db: AsyncIOMotorDatabase = Depends(get_db),
+    db: AsyncIOMotorDatabase = DB,
 ):
     """Get all scene markers for a video, ordered by timestamp."""
-    docs = await (
+    cursor = (
         db[SCENE_MARKERS_COLLECTION]
-        .find({"video_id": str(video_id)})
+        .find({"video_id": video_id})
         .sort("timestamp", 1)
-        .to_list(length=None)
     )
-    return [_doc_to_response(d) for d in docs]
+    return json_array_response(cursor, _doc_fields)
 
 
 @router.delete("/{marker_id}", status_code=204)
 async def delete_marker(
     marker_id: str,
-    db: AsyncIOMotorDatabase = Depends(get_db),
+    db: AsyncIOMotorDatabase = DB,
 ):
     """Delete a single scene marker."""
     try:
@@ -1,32 +1,45 @@
 """
-Video REST API — start / chunk / complete / trim / list / get endpoints.
+Video REST API — start / chunk / complete / trim / list / stream / get endpoints.
 
 v2 additions:
   - codec stored on start
   - trim_end auto-applied on complete ("Smart Stop")
   - PATCH /video/{id}/trim for metadata-based instant trimming
+
+Parts can also skip the API entirely: GET /video/{id}/part-url hands out a
+presigned upload_part URL, the client PUTs the bytes to S3 and reports the
+ETag back through POST /video/{id}/part-ack.
 """
 
 from __future__ import annotations
 
+import asyncio
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, WriteConcern
 
+from app.config import get_settings
 from app.database import get_db
 from app.models import VIDEOS_COLLECTION
 from app.s3 import (
     abort_upload,
     complete_upload,
     generate_s3_key,
+    get_presigned_upload_part,
     get_presigned_url,
+    get_presigned_urls,
     initiate_upload,
+    run_s3,
+    run_s3_part,
     upload_chunk,
 )
 from app.schemas import (
     ChunkUploadResponse,
+    PartAckRequest,
+    PartUrlResponse,
     TrimUpdateRequest,
     VideoCompleteRequest,
     VideoListResponse,
@@ -34,39 +47,53 @@ from app.schemas import (
     VideoStartRequest,
     VideoStartResponse,
 )
+from app.streaming import ndjson_response
 
 router = APIRouter(prefix="/video", tags=["video"])
 
-# In-memory part tracking (production: use Redis or DB)
-_upload_parts: dict[str, list[dict]] = {}
+DB = Depends(get_db)
+
+
+def _doc_fields(doc: dict, playback_url: str | None = None) -> dict:
+    return {
+        "id": doc["_id"],
+        "title": doc.get("title"),
+        "status": doc["status"],
+        "duration": doc.get("duration"),
+        "codec": doc.get("codec"),
+        "trim_start": doc.get("trim_start"),
+        "trim_end": doc.get("trim_end"),
+        "created_at": doc["created_at"],
+        "playback_url": playback_url,
+    }
 
 
 def _doc_to_response(doc: dict, playback_url: str | None = None) -> VideoResponse:
-    return VideoResponse(
-        id=uuid.UUID(doc["_id"]),
-        title=doc.get("title"),
-        status=doc["status"],
-        duration=doc.get("duration"),
-        codec=doc.get("codec"),
-        trim_start=doc.get("trim_start"),
-        trim_end=doc.get("trim_end"),
-        created_at=doc["created_at"],
-        playback_url=playback_url,
-    )
+    return VideoResponse(**_doc_fields(doc, playback_url))
+
+
+def _stored_parts(doc: dict) -> list[dict]:
+    """Turn the {part_number: etag} map on a video into S3's sorted parts list."""
+    stored = doc.get("parts") or {}
+    return [
+        {"ETag": etag, "PartNumber": number}
+        for number, etag in sorted((int(n), e) for n, e in stored.items())
+    ]
 
 
 @router.post("/start", response_model=VideoStartResponse)
 async def start_recording(
     body: VideoStartRequest,
-    db: AsyncIOMotorDatabase = Depends(get_db),
+    db: AsyncIOMotorDatabase = DB,
 ):
     """Initialise a new video recording and S3 multipart upload."""
     video_id = uuid.uuid4()
     s3_key = generate_s3_key(str(video_id))
-    s3_upload_id = initiate_upload(s3_key)
+    s3_upload_id = await run_s3(initiate_upload, s3_key)
 
+    now = datetime.now(timezone.utc)
     doc = {
-        "_id": str(video_id),
+        "_id": video_id,
         "title": body.title,
         "s3_key": s3_key,
         "status": "recording",
@@ -75,10 +102,15 @@ async def start_recording(
         "duration": None,
         "trim_start": None,
         "trim_end": None,
-        "created_at": datetime.now(timezone.utc),
+        "created_at": now,
+        # Bumped by every chunk / part-ack; the stale sweep keys on it
+        "last_activity_at": now,
     }
-    await db[VIDEOS_COLLECTION].insert_one(doc)
-    _upload_parts[str(video_id)] = []
+    # A lost start is recoverable (the client just retries /start), so take
+    # the primary's ack instead of waiting on majority replication.
+    await db[VIDEOS_COLLECTION].with_options(
+        write_concern=WriteConcern(w=1)
+    ).insert_one(doc)
 
     return VideoStartResponse(
         video_id=video_id,
@@ -92,54 +124,117 @@ async def upload_video_chunk(
     video_id: uuid.UUID,
     part_number: int = Query(..., ge=1),
     chunk: UploadFile = File(...),
-    db: AsyncIOMotorDatabase = Depends(get_db),
+    db: AsyncIOMotorDatabase = DB,
 ):
     """Upload a single binary chunk for an in-progress recording (REST fallback)."""
-    doc = await db[VIDEOS_COLLECTION].find_one({"_id": str(video_id)})
+    doc = await db[VIDEOS_COLLECTION].find_one(
+        {"_id": video_id}, {"status": 1, "s3_key": 1, "upload_id": 1}
+    )
     if doc is None:
         raise HTTPException(404, "Video not found")
     if doc["status"] != "recording":
         raise HTTPException(400, "Video is not in recording state")
 
-    data = await chunk.read()
-    if len(data) == 0:
+    # Hand the spooled upload file straight to boto3 instead of reading the
+    # whole part into memory.
+    if not chunk.size:
         raise HTTPException(400, "Empty chunk")
 
-    part = upload_chunk(doc["s3_key"], doc["upload_id"], part_number, data)
+    # boto3 is blocking; run S3 calls on the S3 thread pool so one slow part
+    # upload doesn't stall every other request on this event loop.
+    etag = await run_s3_part(
+        upload_chunk, doc["s3_key"], doc["upload_id"], part_number, chunk.file, chunk.size
+    )
+
+    # Parts live on the video document so any worker (or a restarted one)
+    # can complete the upload. Keyed by part number, a retried chunk
+    # overwrites its earlier ETag instead of adding a duplicate.
+    await db[VIDEOS_COLLECTION].update_one(
+        {"_id": video_id},
+        {
+            "$set": {f"parts.{part_number}": etag},
+            "$currentDate": {"last_activity_at": True},
+        },
+    )
+
+    return ChunkUploadResponse(part_number=part_number, etag=etag)
+
+
+@router.get("/{video_id}/part-url", response_model=PartUrlResponse)
+async def get_part_upload_url(
+    video_id: uuid.UUID,
+    part_number: int = Query(..., ge=1, le=10000),
+    db: AsyncIOMotorDatabase = DB,
+):
+    """Presign an S3 upload_part URL so the client uploads the part directly."""
+    doc = await db[VIDEOS_COLLECTION].find_one(
+        {"_id": video_id}, {"status": 1, "s3_key": 1, "upload_id": 1}
+    )
+    if doc is None:
+        raise HTTPException(404, "Video not found")
+    if doc["status"] != "recording":
+        raise HTTPException(400, "Video is not in recording state")
 
-    vid_key = str(video_id)
-    _upload_parts.setdefault(vid_key, []).append(part)
+    expires_in = get_settings().presigned_url_expiry
+    url = get_presigned_upload_part(
+        doc["s3_key"], doc["upload_id"], part_number, expires_in
+    )
+    return PartUrlResponse(part_number=part_number, url=url, expires_in=expires_in)
 
-    return ChunkUploadResponse(part_number=part["PartNumber"], etag=part["ETag"])
+
+@router.post("/{video_id}/part-ack", response_model=ChunkUploadResponse)
+async def ack_part_upload(
+    video_id: uuid.UUID,
+    body: PartAckRequest,
+    db: AsyncIOMotorDatabase = DB,
+):
+    """Record the ETag of a part the client uploaded through a presigned URL."""
+    result = await db[VIDEOS_COLLECTION].update_one(
+        {"_id": video_id, "status": "recording"},
+        {
+            "$set": {f"parts.{body.part_number}": body.etag},
+            "$currentDate": {"last_activity_at": True},
+        },
+    )
+    if result.matched_count == 0:
+        exists = await db[VIDEOS_COLLECTION].find_one({"_id": video_id}, {"_id": 1})
+        if exists is None:
+            raise HTTPException(404, "Video not found")
+        raise HTTPException(400, "Video is not in recording state")
+
+    return ChunkUploadResponse(part_number=body.part_number, etag=body.etag)
 
 
 @router.post("/complete", response_model=VideoResponse)
 async def complete_recording(
     body: VideoCompleteRequest,
-    db: AsyncIOMotorDatabase = Depends(get_db),
+    db: AsyncIOMotorDatabase = DB,
 ):
     """Finalise the multipart upload after the client stops recording."""
-    vid_key = str(body.video_id)
-    doc = await db[VIDEOS_COLLECTION].find_one({"_id": vid_key})
+    vid_key = body.video_id
+    doc = await db[VIDEOS_COLLECTION].find_one(
+        {"_id": vid_key}, {"status": 1, "s3_key": 1, "upload_id": 1, "parts": 1}
+    )
     if doc is None:
         raise HTTPException(404, "Video not found")
     if doc["status"] != "recording":
         raise HTTPException(400, "Video is not in recording state")
 
-    parts = _upload_parts.get(vid_key, [])
+    parts = _stored_parts(doc)
     if not parts:
         raise HTTPException(400, "No chunks uploaded")
 
-    complete_upload(doc["s3_key"], doc["upload_id"], parts)
+    await run_s3(complete_upload, doc["s3_key"], doc["upload_id"], parts)
 
     update: dict = {"status": "ready", "duration": body.duration}
     if body.trim_end is not None:
         update["trim_end"] = body.trim_end
 
-    await db[VIDEOS_COLLECTION].update_one({"_id": vid_key}, {"$set": update})
-    _upload_parts.pop(vid_key, None)
-
-    updated = await db[VIDEOS_COLLECTION].find_one({"_id": vid_key})
+    updated = await db[VIDEOS_COLLECTION].find_one_and_update(
+        {"_id": vid_key},
+        {"$set": update, "$unset": {"parts": ""}},
+        return_document=ReturnDocument.AFTER,
+    )
     playback_url = get_presigned_url(updated["s3_key"])
     return _doc_to_response(updated, playback_url)
 
@@ -148,31 +243,23 @@ async def complete_recording(
 async def update_trim(
     video_id: uuid.UUID,
     body: TrimUpdateRequest,
-    db: AsyncIOMotorDatabase = Depends(get_db),
+    db: AsyncIOMotorDatabase = DB,
 ):
     """
     Update trim boundaries — metadata-based instant trimming.
     No re-encoding. Pass null to clear a boundary.
     """
-    doc = await db[VIDEOS_COLLECTION].find_one({"_id": str(video_id)})
-    if doc is None:
-        raise HTTPException(404, "Video not found")
-
     set_fields: dict = {}
     unset_fields: dict = {}
 
     if "trim_start" in body.model_fields_set:
         if body.trim_start is not None:
-            if doc.get("duration") and body.trim_start > doc["duration"]:
-                raise HTTPException(400, "trim_start exceeds video duration")
             set_fields["trim_start"] = body.trim_start
         else:
             unset_fields["trim_start"] = ""
 
     if "trim_end" in body.model_fields_set:
         if body.trim_end is not None:
-            if doc.get("duration") and body.trim_end > doc["duration"]:
-                raise HTTPException(400, "trim_end exceeds video duration")
             set_fields["trim_end"] = body.trim_end
         else:
             unset_fields["trim_end"] = ""
@@ -182,10 +269,34 @@ async def update_trim(
         mongo_op["$set"] = set_fields
     if unset_fields:
         mongo_op["$unset"] = unset_fields
-    if mongo_op:
-        await db[VIDEOS_COLLECTION].update_one({"_id": str(video_id)}, mongo_op)
 
-    updated = await db[VIDEOS_COLLECTION].find_one({"_id": str(video_id)})
+    if not mongo_op:
+        updated = await db[VIDEOS_COLLECTION].find_one({"_id": video_id})
+        if updated is None:
+            raise HTTPException(404, "Video not found")
+    else:
+        # Validate against duration server-side in the same atomic update:
+        # boundaries may not exceed a known (non-zero) duration.
+        query: dict = {"_id": video_id}
+        if set_fields:
+            query["$or"] = [
+                {"duration": {"$in": [None, 0]}},
+                {"duration": {"$gte": max(set_fields.values())}},
+            ]
+        updated = await db[VIDEOS_COLLECTION].find_one_and_update(
+            query, mongo_op, return_document=ReturnDocument.AFTER
+        )
+        if updated is None:
+            # Only the failure path pays for a read, to pick the right error
+            doc = await db[VIDEOS_COLLECTION].find_one({"_id": video_id}, {"duration": 1})
+            if doc is None:
+                raise HTTPException(404, "Video not found")
+            duration = doc.get("duration")
+            for field in ("trim_start", "trim_end"):
+                if duration and field in set_fields and set_fields[field] > duration:
+                    raise HTTPException(400, f"{field} exceeds video duration")
+            raise HTTPException(409, "Video changed during update, retry")
+
     playback_url = None
     if updated["status"] == "ready" and updated.get("s3_key"):
         playback_url = get_presigned_url(updated["s3_key"])
@@ -195,33 +306,93 @@ async def update_trim(
 @router.post("/abort/{video_id}")
 async def abort_recording(
     video_id: uuid.UUID,
-    db: AsyncIOMotorDatabase = Depends(get_db),
+    db: AsyncIOMotorDatabase = DB,
 ):
     """Cancel an in-progress upload and clean up S3 parts."""
-    doc = await db[VIDEOS_COLLECTION].find_one({"_id": str(video_id)})
+    doc = await db[VIDEOS_COLLECTION].find_one({"_id": video_id})
     if doc is None:
         raise HTTPException(404, "Video not found")
 
     if doc.get("upload_id") and doc.get("s3_key"):
         try:
-            abort_upload(doc["s3_key"], doc["upload_id"])
+            await run_s3(abort_upload, doc["s3_key"], doc["upload_id"])
         except Exception:
             pass  # best-effort cleanup
 
     await db[VIDEOS_COLLECTION].update_one(
-        {"_id": str(video_id)}, {"$set": {"status": "cancelled"}}
+        {"_id": video_id},
+        {"$set": {"status": "cancelled"}, "$unset": {"parts": ""}},
     )
-    _upload_parts.pop(str(video_id), None)
     return {"status": "aborted"}
 
 
+async def abort_stale_uploads(db: AsyncIOMotorDatabase, older_than: timedelta) -> int:
+    """
+    Abort recordings with no upload activity for ``older_than``.
+    Returns the number of videos moved to "cancelled".
+    """
+    cutoff = datetime.now(timezone.utc) - older_than
+    stale = {
+        "status": "recording",
+        "$or": [
+            {"last_activity_at": {"$lt": cutoff}},
+            # Recordings started before last_activity_at existed
+            {"last_activity_at": {"$exists": False}, "created_at": {"$lt": cutoff}},
+        ],
+    }
+    cursor = db[VIDEOS_COLLECTION].find(stale, {"s3_key": 1, "upload_id": 1})
+    cancelled = 0
+    async for doc in cursor:
+        # Re-check staleness in the update so a recording that completed or
+        # received a chunk since the scan is left alone, and only abort the
+        # S3 upload once the video is actually cancelled.
+        result = await db[VIDEOS_COLLECTION].update_one(
+            {"_id": doc["_id"], **stale},
+            {"$set": {"status": "cancelled"}, "$unset": {"parts": ""}},
+        )
+        if not result.modified_count:
+            continue
+        cancelled += 1
+        if doc.get("upload_id") and doc.get("s3_key"):
+            try:
+                await run_s3(abort_upload, doc["s3_key"], doc["upload_id"])
+            except Exception:
+                pass  # best-effort cleanup; S3 lifecycle rules catch the rest
+    return cancelled
+
+
+def _doc_to_stream_item(doc: dict) -> dict:
+    playback_url = None
+    if doc["status"] == "ready" and doc.get("s3_key"):
+        playback_url = get_presigned_url(doc["s3_key"])
+    return _doc_fields(doc, playback_url)
+
+
+# Declared ahead of /{video_id} so "stream" isn't parsed as a UUID
+@router.get("/stream")
+async def stream_videos(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncIOMotorDatabase = DB,
+):
+    """Stream videos (newest first) as NDJSON, one VideoResponse per line."""
+    cursor = (
+        db[VIDEOS_COLLECTION]
+        .find()
+        .sort("created_at", -1)
+        .skip(offset)
+        .limit(limit)
+    )
+    return ndjson_response(cursor, _doc_to_stream_item)
+
+
 @router.get("/{video_id}", response_model=VideoResponse)
 async def get_video(
     video_id: uuid.UUID,
-    db: AsyncIOMotorDatabase = Depends(get_db),
+    db: AsyncIOMotorDatabase = DB,
 ):
     """Retrieve a single video by ID with a fresh pre-signed URL."""
-    doc = await db[VIDEOS_COLLECTION].find_one({"_id": str(video_id)})
+    doc = await db[VIDEOS_COLLECTION].find_one({"_id": video_id})
     if doc is None:
         raise HTTPException(404, "Video not found")
 
@@ -236,11 +407,9 @@ async def get_video(
 async def list_videos(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: AsyncIOMotorDatabase = Depends(get_db),
+    db: AsyncIOMotorDatabase = DB,
 ):
     """List all videos (newest first)."""
-    total = await db[VIDEOS_COLLECTION].count_documents({})
-
     cursor = (
         db[VIDEOS_COLLECTION]
         .find()
@@ -248,14 +417,24 @@ async def list_videos(
         .skip(offset)
         .limit(limit)
     )
-    docs = await cursor.to_list(length=limit)
+    # Run the page query and the total concurrently; with no filter the total
+    # comes straight from collection metadata instead of a scan.
+    total, docs = await asyncio.gather(
+        db[VIDEOS_COLLECTION].estimated_document_count(),
+        cursor.to_list(length=limit),
+    )
+
+    # Signing is local HMAC work and mostly cache hits, so do it inline
+    # rather than queue behind part uploads on the S3 thread pool.
+    ready = [d for d in docs if d["status"] == "ready" and d.get("s3_key")]
+    urls = get_presigned_urls([d["s3_key"] for d in ready])
+    playback_urls = {d["_id"]: url for d, url in zip(ready, urls)}
 
-    items = []
-    for d in docs:
-        playback_url = None
-        if d["status"] == "ready" and d.get("s3_key"):
-            playback_url = get_presigned_url(d["s3_key"])
-        items.append(_doc_to_response(d, playback_url))
+    # Plain dicts, with no VideoResponse built here. FastAPI still validates
+    # every item against response_model before serialising it. That is kept
+    # on purpose: bypassing it would need the deprecated ORJSONResponse, and
+    # it keeps the payload to the declared schema.
+    items = [_doc_fields(d, playback_urls.get(d["_id"])) for d in docs]
 
-    return VideoListResponse(videos=items, total=total)
+    return {"videos": items, "total": total}
 
@@ -4,11 +4,21 @@ WebSocket endpoint for real-time chunk ingestion — Sine v2.
 Protocol (binary frames with JSON control messages):
   1. Client connects to  ws://.../ws/upload/{video_id}
   2. Client sends binary frames (video chunks)
-  3. Server streams each frame directly to S3 (upload_part)
+  3. Server streams each frame directly to S3 (upload_part), up to
+     MAX_INFLIGHT_PARTS at a time, and acks stored parts in batches:
+     {"event": "chunk_ack", "part_numbers": [1, 3, 2]} (not necessarily sorted)
   4. Client sends JSON  {"action": "complete", "duration": 42.5}  to finalise
   5. Client sends JSON  {"action": "marker", ...}  to record a scene marker
   6. Server responds with  {"status": "ready", "playback_url": "..."}
 
+Server → client frames are JSON text by default. Clients may offer one of
+these subprotocols (the first recognised one is accepted):
+  - "sine.msgpack.v1" → server frames are msgpack binary frames instead;
+    the client's control messages stay JSON text, since binary is video
+  - "sine.no-ack.v1"  → no chunk_acks at all; the complete event reports
+    the part count, and a failed part is still reported as
+    {"error": "part_failed", "part_number": N}
+
 v2 additions:
   - "marker" action → stores SceneMarker during recording
   - "complete" accepts optional trim_end for Smart Stop
@@ -16,228 +26,388 @@ v2 additions:
 
 from __future__ import annotations
 
-import json
+import asyncio
+import logging
+import time
 import uuid
+from contextlib import suppress
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Awaitable, Callable
 
+import msgpack
+import orjson
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo import ReturnDocument
 
 from app.database import get_database
 from app.models import SCENE_MARKERS_COLLECTION, VIDEOS_COLLECTION
-from app.s3 import complete_upload, get_presigned_url, upload_chunk
+from app.s3 import (
+    complete_upload,
+    get_presigned_url,
+    run_s3,
+    run_s3_part,
+    upload_chunk,
+)
+from app.schemas import SceneMarkerCreate
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+# Parts uploaded to S3 concurrently per connection. Overlaps the S3 round
+# trips of consecutive chunks while bounding how many frames sit in memory.
+MAX_INFLIGHT_PARTS = 8
+
+# chunk_acks are coalesced into one frame per this many parts, or after
+# this many seconds, whichever comes first.
+ACK_BATCH_SIZE = 16
+ACK_FLUSH_DELAY = 0.02
+
+# Scene markers are written with one insert_many per this many markers,
+# and whatever is left over on complete or disconnect.
+MARKER_BATCH_SIZE = 50
+
+# An open session bumps the video's last_activity_at at most this often, so
+# the stale-upload sweep never aborts a recording that is still streaming.
+ACTIVITY_TOUCH_INTERVAL = 60.0
+
+MSGPACK_SUBPROTOCOL = "sine.msgpack.v1"
+NO_ACK_SUBPROTOCOL = "sine.no-ack.v1"
+SUBPROTOCOLS = (MSGPACK_SUBPROTOCOL, NO_ACK_SUBPROTOCOL)
+
+
+class PartUploadFailed(Exception):
+    """An S3 upload_part for a WebSocket chunk raised."""
+
+    def __init__(self, part_number: int):
+        super().__init__(f"Upload of part {part_number} failed")
+        self.part_number = part_number
+
+
+class AckBatcher:
+    """Buffers chunk_ack part numbers so a burst of parts costs one send."""
+
+    def __init__(self, send: Callable[[dict], Awaitable[None]]):
+        self.send = send
+        self.pending: list[int] = []
+        self._timer: asyncio.Task | None = None
+
+    def add(self, part_number: int) -> None:
+        """Queue an ack; called from upload done-callbacks, so never awaits."""
+        self.pending.append(part_number)
+        if len(self.pending) >= ACK_BATCH_SIZE:
+            self.cancel()
+            self._timer = asyncio.create_task(self._flush_later(0))
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later(ACK_FLUSH_DELAY))
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._timer = None
+        # Nothing awaits this task, so its errors must not escape it
+        try:
+            await self.flush()
+        except (WebSocketDisconnect, RuntimeError):
+            logger.debug("Dropped a chunk_ack batch; the socket is closed")
+        except Exception:
+            logger.exception("Failed to send a chunk_ack batch")
+
+    async def flush(self) -> None:
+        self.cancel()
+        if not self.pending:
+            return
+        part_numbers, self.pending = self.pending, []
+        await self.send({"event": "chunk_ack", "part_numbers": part_numbers})
+
+    def cancel(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+@dataclass
+class UploadSession:
+    """Per-connection upload state shared by the control-message handlers."""
+
+    websocket: WebSocket
+    db: AsyncIOMotorDatabase
+    video_id: uuid.UUID
+    s3_key: str
+    upload_id: str
+    use_msgpack: bool = False
+    send_acks: bool = True
+    part_number: int = 1
+    # ETag of part n at index n - 1; "" until that part's upload finishes
+    etags: list[str] = field(default_factory=list)
+    # upload task → the part number it is uploading
+    inflight: dict[asyncio.Task, int] = field(default_factory=dict)
+    # First part whose upload raised; stops the session at the next frame
+    failed_part: int | None = None
+    failure_report: asyncio.Task | None = None
+    marker_buffer: list[dict[str, Any]] = field(default_factory=list)
+    # time.monotonic() of the last last_activity_at write; 0 → first frame writes
+    last_touch: float = 0.0
+    acks: AckBatcher = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.acks = AckBatcher(self.send)
+
+    async def send(self, message: dict) -> None:
+        """Send a control frame: orjson text, or msgpack if negotiated."""
+        if self.use_msgpack:
+            await self.websocket.send_bytes(msgpack.packb(message, use_bin_type=True))
+        else:
+            await self.websocket.send_text(orjson.dumps(message).decode())
+
+    async def touch(self) -> None:
+        """Bump last_activity_at, at most once per ACTIVITY_TOUCH_INTERVAL."""
+        now = time.monotonic()
+        if now - self.last_touch < ACTIVITY_TOUCH_INTERVAL:
+            return
+        self.last_touch = now
+        await self.db[VIDEOS_COLLECTION].update_one(
+            {"_id": self.video_id}, {"$currentDate": {"last_activity_at": True}}
+        )
+
+    async def upload(self, data: bytes) -> None:
+        """Start uploading ``data`` as the next part, keeping the window bounded."""
+        self.raise_if_failed()
+        if len(self.inflight) >= MAX_INFLIGHT_PARTS:
+            await asyncio.wait(
+                list(self.inflight), return_when=asyncio.FIRST_COMPLETED
+            )
+            self.raise_if_failed()
+
+        task = asyncio.create_task(run_s3_part(
+            upload_chunk, self.s3_key, self.upload_id, self.part_number, data
+        ))
+        self.inflight[task] = self.part_number
+        task.add_done_callback(self._part_done)
+        self.etags.append("")
+        self.part_number += 1
+
+    def _part_done(self, task: asyncio.Task) -> None:
+        """Record (and ack) a part the moment its upload finishes."""
+        part_number = self.inflight.pop(task)
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is None:
+            self.etags[part_number - 1] = task.result()
+            if self.send_acks:
+                self.acks.add(part_number)
+        elif self.failed_part is None:
+            self.failed_part = part_number
+            logger.error(
+                "WebSocket upload for video %s failed at part %d",
+                self.video_id, part_number, exc_info=exc,
+            )
+            # The client may be idle waiting on this part's ack; report now
+            # rather than at its next frame.
+            self.failure_report = asyncio.create_task(self._report_failure())
+
+    async def _report_failure(self) -> None:
+        # Ack what did land, then say which part did not. The client may
+        # already be gone; then there is nobody left to tell.
+        with suppress(WebSocketDisconnect, RuntimeError):
+            await self.acks.flush()
+            await self.send({"error": "part_failed", "part_number": self.failed_part})
+            await self.websocket.close(code=1011)
+
+    def raise_if_failed(self) -> None:
+        if self.failed_part is not None:
+            raise PartUploadFailed(self.failed_part)
+
+    async def drain(self) -> None:
+        """Wait for every in-flight part and ack them all."""
+        if self.inflight:
+            await asyncio.wait(list(self.inflight))
+        self.raise_if_failed()
+        await self.acks.flush()
+
+    async def flush_markers(self) -> None:
+        if not self.marker_buffer:
+            return
+        # Claim orders from the same per-video counter the REST endpoints
+        # use, at write time, so markers from both paths never share one.
+        count = len(self.marker_buffer)
+        video = await self.db[VIDEOS_COLLECTION].find_one_and_update(
+            {"_id": self.video_id},
+            {"$inc": {"marker_seq": count}},
+            projection={"marker_seq": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        first_order = video["marker_seq"] - count
+        for i, marker in enumerate(self.marker_buffer):
+            marker["order"] = first_order + i
+        await self.db[SCENE_MARKERS_COLLECTION].insert_many(self.marker_buffer)
+        self.marker_buffer.clear()
+
+    def close(self) -> None:
+        self.acks.cancel()
+        for task in list(self.inflight):
+            task.cancel()
+
+
+# Control handlers return True once the connection is finished.
+
+async def _handle_marker(session: UploadSession, payload: dict) -> bool:
+    """Scene Marker (v2)."""
+    # Held to the same rules as POST /markers, since the list endpoints
+    # stream stored markers without re-validating them
+    try:
+        marker = SceneMarkerCreate(
+            video_id=session.video_id,
+            timestamp=payload.get("timestamp", 0),
+            label=payload.get("label") or "Scene change",
+            source=payload.get("source") or "focus_switch",
+        )
+    except ValidationError:
+        await session.send({"error": "Invalid marker"})
+        return False
+    timestamp, label = marker.timestamp, marker.label
+
+    session.marker_buffer.append({
+        "video_id": session.video_id,
+        "timestamp": timestamp,
+        "label": label,
+        "source": marker.source,
+        "created_at": datetime.now(timezone.utc),
+    })
+    if len(session.marker_buffer) >= MARKER_BATCH_SIZE:
+        await session.flush_markers()
+
+    await session.send({"event": "marker_ack", "timestamp": timestamp, "label": label})
+    return False
+
+
+async def _handle_complete(session: UploadSession, payload: dict) -> bool:
+    """Complete Recording."""
+    await session.drain()
+    if not session.etags:
+        await session.send({"error": "No chunks uploaded"})
+        return False
+
+    parts = [
+        {"ETag": etag, "PartNumber": n}
+        for n, etag in enumerate(session.etags, start=1)
+    ]
+    # The marker write doesn't depend on S3 finishing, so overlap it with
+    # complete_multipart_upload. The video is only marked ready below, once
+    # S3 has actually assembled the object.
+    await asyncio.gather(
+        run_s3(complete_upload, session.s3_key, session.upload_id, parts),
+        session.flush_markers(),
+    )
+    # Local HMAC work (or a cache hit); not worth a worker thread
+    playback_url = get_presigned_url(session.s3_key)
+
+    duration = payload.get("duration")
+    trim_end = payload.get("trim_end")  # v2: Smart Stop
+
+    update: dict = {"status": "ready", "duration": duration}
+    if trim_end is not None:
+        update["trim_end"] = trim_end
+
+    await session.db[VIDEOS_COLLECTION].update_one(
+        {"_id": session.video_id}, {"$set": update}
+    )
+
+    await session.send(
+        {
+            "event": "complete",
+            "status": "ready",
+            "playback_url": playback_url,
+            "parts": len(parts),
+        }
+    )
+    await session.websocket.close()
+    return True
+
+
+async def _handle_ping(session: UploadSession, payload: dict) -> bool:
+    await session.send({"event": "pong"})
+    return False
+
+
+_HANDLERS: dict[str, Callable[[UploadSession, dict], Awaitable[bool]]] = {
+    "marker": _handle_marker,
+    "complete": _handle_complete,
+    "ping": _handle_ping,
+}
+
 
 @router.websocket("/ws/upload/{video_id}")
 async def ws_upload(websocket: WebSocket, video_id: uuid.UUID):
     """Accept streaming binary chunks over WebSocket and push to S3."""
-    await websocket.accept()
+    offered = websocket.scope.get("subprotocols", ())
+    subprotocol = next((p for p in offered if p in SUBPROTOCOLS), None)
+    await websocket.accept(subprotocol=subprotocol)
 
     db = get_database()
 
-    doc = await db[VIDEOS_COLLECTION].find_one({"_id": str(video_id)})
+    doc = await db[VIDEOS_COLLECTION].find_one(
+        {"_id": video_id},
+        {"status": 1, "s3_key": 1, "upload_id": 1},
+    )
     if doc is None or doc["status"] != "recording":
         await websocket.close(code=4000, reason="Invalid video or state")
         return
 
-    s3_key = doc["s3_key"]
-    upload_id = doc["upload_id"]
-
-    part_number = 1
-    parts: list[dict[str, Any]] = []
-    marker_order = 0
-
-    try:
-        while True:
-            message = await websocket.receive()
-
-            # Binary frame → upload chunk to S3
-            if "bytes" in message and message["bytes"]:
-                data = message["bytes"]
-                part = upload_chunk(s3_key, upload_id, part_number, data)
-                parts.append(part)
-
-                await websocket.send_json(
-                    {"event": "chunk_ack", "part_number": part_number}
-                )
-                part_number += 1
-
-            # Text frame → control message
-            elif "text" in message and message["text"]:
-                try:
-                    payload = json.loads(message["text"])
-                except json.JSONDecodeError:
-                    await websocket.send_json({"error": "Invalid JSON"})
-                    continue
-
-                action = payload.get("action")
-
-                # ── Scene Marker (v2) ───────────────────────────
-                if action == "marker":
-                    timestamp = payload.get("timestamp", 0)
-                    label = payload.get("label", "Scene change")
-                    source = payload.get("source", "focus_switch")
-
-                    await db[SCENE_MARKERS_COLLECTION].insert_one({
-                        "video_id": str(video_id),
-                        "timestamp": timestamp,
-                        "label": label,
-                        "source": source,
-                        "order": marker_order,
-                        "created_at": datetime.now(timezone.utc),
-                    })
-                    marker_order += 1
-
-                    await websocket.send_json(
-                        {"event": "marker_ack", "timestamp": timestamp, "label": label}
-                    )
-
-                # ── Complete Recording ──────────────────────────
-                elif action == "complete":
-                    if not parts:
-                        await websocket.send_json({"error": "No chunks uploaded"})
-                        continue
-
-                    complete_upload(s3_key, upload_id, parts)
-
-                    duration = payload.get("duration")
-                    trim_end = payload.get("trim_end")  # v2: Smart Stop
-
-                    update: dict = {"status": "ready", "duration": duration}
-                    if trim_end is not None:
-                        update["trim_end"] = trim_end
-
-                    await db[VIDEOS_COLLECTION].update_one(
-                        {"_id": str(video_id)}, {"$set": update}
-                    )
-
-                    playback_url = get_presigned_url(s3_key)
-                    await websocket.send_json(
-                        {
-                            "event": "complete",
-                            "status": "ready",
-                            "playback_url": playback_url,
-                        }
-                    )
-                    await websocket.close()
-                    return
-
-                elif action == "ping":
-                    await websocket.send_json({"event": "pong"})
-
-    except WebSocketDisconnect:
-        # Client disconnected — parts remain in S3 for potential resume
-        pass
-
-
-
-@router.websocket("/ws/upload/{video_id}")
-async def ws_upload(websocket: WebSocket, video_id: uuid.UUID):
-    """Accept streaming binary chunks over WebSocket and push to S3."""
-    await websocket.accept()
-
-    # Load video record
-    async with async_session() as db:
-        result = await db.execute(select(Video).where(Video.id == video_id))
-        video = result.scalar_one_or_none()
-
-        if video is None or video.status != "recording":
-            await websocket.close(code=4000, reason="Invalid video or state")
-            return
-
-        s3_key = video.s3_key
-        upload_id = video.upload_id
-
-    part_number = 1
-    parts: list[dict[str, Any]] = []
-    marker_order = 0
+    session = UploadSession(
+        websocket=websocket,
+        db=db,
+        video_id=video_id,
+        s3_key=doc["s3_key"],
+        upload_id=doc["upload_id"],
+        use_msgpack=subprotocol == MSGPACK_SUBPROTOCOL,
+        send_acks=subprotocol != NO_ACK_SUBPROTOCOL,
+    )
 
     try:
         while True:
             message = await websocket.receive()
+            # receive() reports a close as a message rather than raising; one
+            # type check per frame covers it without unwinding an exception.
+            if message["type"] == "websocket.disconnect":
+                break
+            await session.touch()
 
             # Binary frame → upload chunk to S3
-            if "bytes" in message and message["bytes"]:
-                data = message["bytes"]
-                part = upload_chunk(s3_key, upload_id, part_number, data)
-                parts.append(part)
-
-                await websocket.send_json(
-                    {"event": "chunk_ack", "part_number": part_number}
-                )
-                part_number += 1
+            data = message.get("bytes")
+            if data:
+                await session.upload(data)
+                continue
 
             # Text frame → control message
-            elif "text" in message and message["text"]:
-                try:
-                    payload = json.loads(message["text"])
-                except json.JSONDecodeError:
-                    await websocket.send_json({"error": "Invalid JSON"})
-                    continue
-
-                action = payload.get("action")
-
-                # ── Scene Marker (v2) ──────────────────────────────────
-                if action == "marker":
-                    timestamp = payload.get("timestamp", 0)
-                    label = payload.get("label", "Scene change")
-                    source = payload.get("source", "focus_switch")
-
-                    async with async_session() as db:
-                        marker = SceneMarker(
-                            video_id=video_id,
-                            timestamp=timestamp,
-                            label=label,
-                            source=source,
-                            order=marker_order,
-                        )
-                        db.add(marker)
-                        await db.commit()
-                        marker_order += 1
-
-                    await websocket.send_json(
-                        {"event": "marker_ack", "timestamp": timestamp, "label": label}
-                    )
-
-                # ── Complete Recording ─────────────────────────────────
-                elif action == "complete":
-                    if not parts:
-                        await websocket.send_json({"error": "No chunks uploaded"})
-                        continue
-
-                    complete_upload(s3_key, upload_id, parts)
-
-                    duration = payload.get("duration")
-                    trim_end = payload.get("trim_end")  # v2: Smart Stop
-
-                    async with async_session() as db:
-                        result = await db.execute(
-                            select(Video).where(Video.id == video_id)
-                        )
-                        video = result.scalar_one_or_none()
-                        if video:
-                            video.status = "ready"
-                            video.duration = duration
-                            if trim_end is not None:
-                                video.trim_end = trim_end
-                            await db.commit()
-
-                    playback_url = get_presigned_url(s3_key)
-                    await websocket.send_json(
-                        {
-                            "event": "complete",
-                            "status": "ready",
-                            "playback_url": playback_url,
-                        }
-                    )
-                    await websocket.close()
-                    return
-
-                elif action == "ping":
-                    await websocket.send_json({"event": "pong"})
-
+            text = message.get("text")
+            if not text:
+                continue
+            try:
+                payload = orjson.loads(text)
+            except orjson.JSONDecodeError:
+                payload = None
+            if not isinstance(payload, dict):
+                await session.send({"error": "Invalid JSON"})
+                continue
+
+            handler = _HANDLERS.get(payload.get("action"))
+            if handler is not None and await handler(session, payload):
+                return
+
+    except PartUploadFailed:
+        # _part_done already logged it and is reporting it to the client
+        await session.failure_report
     except WebSocketDisconnect:
-        # Client disconnected — parts remain in S3 for potential resume
-        pass
+        pass  # a send raced the client closing the socket
+    finally:
+        session.close()
+        # However the session ended, parts remain in S3 for potential resume
+        # and markers already acked to the client are still kept.
+        try:
+            await session.flush_markers()
+        except Exception:
+            logger.exception("Failed to save scene markers for video %s", video_id)
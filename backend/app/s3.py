@@ -6,12 +6,20 @@ This module provides the core "Stream-to-Upload" logic:
   3. complete_upload()   → Finalises the multipart upload
   4. abort_upload()      → Cleans up on failure
   5. get_presigned_url() → Generates a time-limited playback URL
+  6. get_presigned_upload_part() → Lets a client PUT a part straight to S3
+  7. warm_up()           → Builds the client ahead of the first request
+  8. run_s3()            → Awaits any of the above on the S3 thread pool
+  9. run_s3_part()       → run_s3() for upload_chunk, within the part-upload cap
 """
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import time
 import uuid
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Optional, TypeVar
 
 import boto3
 from botocore.config import Config as BotoConfig
@@ -19,13 +27,24 @@ from botocore.config import Config as BotoConfig
 from app.config import get_settings
 
 _client = None
+_executor: ThreadPoolExecutor | None = None
+_part_slots: asyncio.Semaphore | None = None
+# Read from settings once, alongside the client, instead of on every call
+_bucket: str = ""
+_url_expiry: int = 0
+
+# s3_key → (playback URL, monotonic time after which it is re-signed)
+_url_cache: dict[str, tuple[str, float]] = {}
+_URL_CACHE_MAX = 4096
 
 
 def _get_s3_client():
     """Lazy-initialised, reusable S3 client."""
-    global _client
+    global _client, _bucket, _url_expiry
     if _client is None:
         settings = get_settings()
+        _bucket = settings.s3_bucket_name
+        _url_expiry = settings.presigned_url_expiry
         _client = boto3.client(
             "s3",
             aws_access_key_id=settings.aws_access_key_id,
@@ -34,11 +53,73 @@ def _get_s3_client():
             config=BotoConfig(
                 signature_version="s3v4",
                 retries={"max_attempts": 3, "mode": "adaptive"},
+                # One connection per S3 worker thread, so none of them wait
+                # on (or churn) the urllib3 pool
+                max_pool_connections=settings.s3_max_workers,
             ),
         )
     return _client
 
 
+def _get_executor() -> ThreadPoolExecutor:
+    """Lazy-initialised thread pool dedicated to blocking S3 calls."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_settings().s3_max_workers, thread_name_prefix="s3"
+        )
+    return _executor
+
+
+T = TypeVar("T")
+
+
+async def run_s3(func: Callable[..., T], *args: Any) -> T:
+    """Run a blocking S3 helper off the event loop.
+
+    Uses its own pool rather than asyncio's default executor, so a burst of
+    part uploads can't starve other ``to_thread`` users, and the pool size
+    matches the client's connection pool.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(func, *args))
+
+
+async def run_s3_part(func: Callable[..., T], *args: Any) -> T:
+    """``run_s3`` for part uploads, capped process-wide at s3_max_part_uploads.
+
+    Every WebSocket session and REST chunk shares the S3 pool; without the
+    cap a few fast uploaders would occupy every thread and queue the
+    initiate/complete calls that open and close other recordings.
+    """
+    global _part_slots
+    if _part_slots is None:
+        settings = get_settings()
+        _part_slots = asyncio.Semaphore(
+            max(1, min(settings.s3_max_part_uploads, settings.s3_max_workers - 1))
+        )
+    slots = _part_slots
+    await slots.acquire()
+    # Cancelling the caller can't stop a boto3 call already on its thread, so
+    # the slot is tied to the executor future, not to the awaiting task. A
+    # dropped WebSocket cancels its in-flight parts; those uploads keep their
+    # slots until their threads are actually free.
+    try:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(_get_executor(), functools.partial(func, *args))
+    except BaseException:
+        slots.release()
+        raise
+
+    def _finished(f: asyncio.Future) -> None:
+        slots.release()
+        if not f.cancelled():
+            f.exception()  # retrieved, so an abandoned failure isn't logged
+
+    future.add_done_callback(_finished)
+    return await asyncio.shield(future)
+
+
 def generate_s3_key(video_id: str, extension: str = "webm") -> str:
     """Produce a unique S3 object key for a video."""
     return f"videos/{video_id}/{uuid.uuid4().hex}.{extension}"
@@ -46,10 +127,9 @@ def generate_s3_key(video_id: str, extension: str = "webm") -> str:
 
 def initiate_upload(s3_key: str) -> str:
     """Start a multipart upload; return the UploadId."""
-    settings = get_settings()
     client = _get_s3_client()
     response = client.create_multipart_upload(
-        Bucket=settings.s3_bucket_name,
+        Bucket=_bucket,
         Key=s3_key,
         ContentType="video/webm",
     )
@@ -60,53 +140,102 @@ def upload_chunk(
     s3_key: str,
     upload_id: str,
     part_number: int,
-    data: bytes,
-) -> dict:
-    """Upload a single part to S3. Returns {"ETag": ..., "PartNumber": ...}."""
-    settings = get_settings()
+    data: bytes | BinaryIO,
+    content_length: Optional[int] = None,
+) -> str:
+    """Upload a single part to S3. Returns the part's ETag.
+
+    ``data`` may be raw bytes or a readable file object; file objects are
+    streamed by botocore rather than read into memory first.
+    """
     client = _get_s3_client()
+    extra = {} if content_length is None else {"ContentLength": content_length}
     response = client.upload_part(
-        Bucket=settings.s3_bucket_name,
+        Bucket=_bucket,
         Key=s3_key,
         UploadId=upload_id,
         PartNumber=part_number,
         Body=data,
+        **extra,
     )
-    return {"ETag": response["ETag"], "PartNumber": part_number}
+    return response["ETag"]
 
 
 def complete_upload(s3_key: str, upload_id: str, parts: list[dict]) -> str:
-    """Finalise the multipart upload. Returns the S3 object location."""
-    settings = get_settings()
+    """Finalise the multipart upload. Returns the S3 object location.
+
+    ``parts`` must already be sorted by PartNumber, as S3 requires.
+    """
     client = _get_s3_client()
-    # Parts must be sorted by PartNumber
-    sorted_parts = sorted(parts, key=lambda p: p["PartNumber"])
     response = client.complete_multipart_upload(
-        Bucket=settings.s3_bucket_name,
+        Bucket=_bucket,
         Key=s3_key,
         UploadId=upload_id,
-        MultipartUpload={"Parts": sorted_parts},
+        MultipartUpload={"Parts": parts},
     )
     return response.get("Location", s3_key)
 
 
 def abort_upload(s3_key: str, upload_id: str) -> None:
     """Cancel a multipart upload and remove any uploaded parts."""
-    settings = get_settings()
     client = _get_s3_client()
     client.abort_multipart_upload(
-        Bucket=settings.s3_bucket_name,
+        Bucket=_bucket,
         Key=s3_key,
         UploadId=upload_id,
     )
 
 
 def get_presigned_url(s3_key: str, expiry: Optional[int] = None) -> str:
-    """Generate a pre-signed GET URL for secure playback."""
-    settings = get_settings()
+    """Generate a pre-signed GET URL for secure playback.
+
+    URLs with the default lifetime are reused for half of it, so every URL
+    handed out still has at least half its validity left for range reads.
+    """
+    now = time.monotonic()
+    if expiry is None:
+        cached = _url_cache.get(s3_key)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+
     client = _get_s3_client()
-    return client.generate_presigned_url(
+    url = client.generate_presigned_url(
         "get_object",
-        Params={"Bucket": settings.s3_bucket_name, "Key": s3_key},
-        ExpiresIn=expiry or settings.presigned_url_expiry,
+        Params={"Bucket": _bucket, "Key": s3_key},
+        ExpiresIn=expiry or _url_expiry,
     )
+    if expiry is None:
+        if len(_url_cache) >= _URL_CACHE_MAX:
+            _url_cache.clear()
+        _url_cache[s3_key] = (url, now + _url_expiry / 2)
+    return url
+
+
+def get_presigned_upload_part(
+    s3_key: str,
+    upload_id: str,
+    part_number: int,
+    expiry: Optional[int] = None,
+) -> str:
+    """Generate a pre-signed PUT URL for one part of a multipart upload."""
+    client = _get_s3_client()
+    return client.generate_presigned_url(
+        "upload_part",
+        Params={
+            "Bucket": _bucket,
+            "Key": s3_key,
+            "UploadId": upload_id,
+            "PartNumber": part_number,
+        },
+        ExpiresIn=expiry or _url_expiry,
+    )
+
+
+def get_presigned_urls(s3_keys: list[str]) -> list[str]:
+    """Sign several playback URLs in one call (list endpoints)."""
+    return [get_presigned_url(key) for key in s3_keys]
+
+
+def warm_up() -> None:
+    """Build the S3 client eagerly so no request pays the botocore load cost."""
+    _get_s3_client()
@@ -116,3 +116,18 @@ class SceneMarkerResponse(BaseModel):
 class ChunkUploadResponse(BaseModel):
     part_number: int
     etag: str
+
+
+# ─── Direct-to-S3 parts ───────────────────────────────────────────────────────
+
+
+class PartUrlResponse(BaseModel):
+    """Presigned URL the client PUTs a part to, bypassing the API."""
+    part_number: int
+    url: str
+    expires_in: int
+
+
+class PartAckRequest(BaseModel):
+    part_number: int = Field(..., ge=1, le=10000)
+    etag: str = Field(..., min_length=1)
@@ -0,0 +1,60 @@
+"""Streaming JSON responses for list endpoints.
+
+Large per-video lists (markers, annotations) are encoded row-by-row with
+orjson straight off the Motor cursor, so the full result set never sits in
+memory as documents *and* Pydantic models at the same time. NDJSON output
+goes one step further: each line is a complete document, so clients can
+render the first item before the cursor is exhausted.
+"""
+
+from __future__ import annotations
+
+from typing import AsyncIterator, Callable
+
+import orjson
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorCursor
+
+CURSOR_BATCH_SIZE = 500
+
+
+async def _iter_json_array(
+    cursor: AsyncIOMotorCursor,
+    build: Callable[[dict], dict],
+) -> AsyncIterator[bytes]:
+    yield b"["
+    first = True
+    async for doc in cursor.batch_size(CURSOR_BATCH_SIZE):
+        if not first:
+            yield b","
+        yield orjson.dumps(build(doc))
+        first = False
+    yield b"]"
+
+
+def json_array_response(
+    cursor: AsyncIOMotorCursor,
+    build: Callable[[dict], dict],
+) -> StreamingResponse:
+    """Stream ``cursor`` as a JSON array, mapping each document with ``build``."""
+    return StreamingResponse(
+        _iter_json_array(cursor, build), media_type="application/json"
+    )
+
+
+async def _iter_ndjson(
+    cursor: AsyncIOMotorCursor,
+    build: Callable[[dict], dict],
+) -> AsyncIterator[bytes]:
+    async for doc in cursor.batch_size(CURSOR_BATCH_SIZE):
+        yield orjson.dumps(build(doc), option=orjson.OPT_APPEND_NEWLINE)
+
+
+def ndjson_response(
+    cursor: AsyncIOMotorCursor,
+    build: Callable[[dict], dict],
+) -> StreamingResponse:
+    """Stream ``cursor`` as newline-delimited JSON, one ``build(doc)`` per line."""
+    return StreamingResponse(
+        _iter_ndjson(cursor, build), media_type="application/x-ndjson"
+    )
@@ -0,0 +1,196 @@
+"""In-memory stand-ins for the Motor collections the app touches.
+
+Only the query and update operators the app actually uses are implemented;
+anything else raises, so a test can't silently pass on an unsupported query.
+"""
+
+from __future__ import annotations
+
+import copy
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+_MISSING = object()
+
+
+def _get(doc, path):
+    for key in path.split("."):
+        if not isinstance(doc, dict) or key not in doc:
+            return _MISSING
+        doc = doc[key]
+    return doc
+
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(cond, dict) and any(k.startswith("$") for k in cond):
+            for op, arg in cond.items():
+                if op == "$lt":
+                    ok = value is not _MISSING and value < arg
+                elif op == "$exists":
+                    ok = (value is not _MISSING) == arg
+                elif op == "$type":
+                    assert arg == "string", arg
+                    ok = isinstance(value, str)
+                else:
+                    raise NotImplementedError(op)
+                if not ok:
+                    return False
+        elif value is _MISSING or value != cond:
+            return False
+    return True
+
+
+def _apply(doc, update):
+    for op, fields in update.items():
+        for path, arg in fields.items():
+            *parents, leaf = path.split(".")
+            target = doc
+            for key in parents:
+                target = target.setdefault(key, {})
+            if op == "$set":
+                target[leaf] = arg
+            elif op == "$unset":
+                target.pop(leaf, None)
+            elif op == "$inc":
+                target[leaf] = target.get(leaf, 0) + arg
+            elif op == "$max":
+                if leaf not in target or target[leaf] < arg:
+                    target[leaf] = arg
+            elif op == "$currentDate":
+                target[leaf] = datetime.now(timezone.utc)
+            else:
+                raise NotImplementedError(op)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            self.docs.sort(key=lambda d: d.get(field), reverse=order < 0)
+        return self
+
+    def skip(self, n):
+        self.docs = self.docs[n:]
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs[:length]
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, docs=None):
+        self.docs = list(docs or [])
+        self.indexes = {}
+
+    # Like a real driver, reads hand out copies: mutating a returned
+    # document must not change what is stored.
+    def find(self, query=None, projection=None):
+        return FakeCursor(
+            [copy.deepcopy(d) for d in self.docs if _matches(d, query or {})]
+        )
+
+    async def find_one(self, query, projection=None):
+        return copy.deepcopy(self._stored(query))
+
+    def _stored(self, query):
+        return next((d for d in self.docs if _matches(d, query)), None)
+
+    async def insert_one(self, doc):
+        doc.setdefault("_id", ObjectId())
+        if any(d["_id"] == doc["_id"] for d in self.docs):
+            raise DuplicateKeyError("duplicate _id")
+        self.docs.append(copy.deepcopy(doc))
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            await self.insert_one(doc)
+
+    async def update_one(self, query, update):
+        doc = self._stored(query)
+        if doc is not None:
+            _apply(doc, update)
+        count = int(doc is not None)
+        return SimpleNamespace(matched_count=count, modified_count=count)
+
+    async def update_many(self, query, update):
+        docs = [d for d in self.docs if _matches(d, query)]
+        for doc in docs:
+            _apply(doc, update)
+        return SimpleNamespace(matched_count=len(docs), modified_count=len(docs))
+
+    async def delete_one(self, query):
+        doc = self._stored(query)
+        if doc is not None:
+            self.docs.remove(doc)
+        return SimpleNamespace(deleted_count=int(doc is not None))
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        doc = self._stored(query)
+        if doc is not None:
+            _apply(doc, update)
+        return copy.deepcopy(doc)
+
+    async def distinct(self, key, query=None):
+        values = []
+        for doc in self.docs:
+            value = _get(doc, key)
+            if _matches(doc, query or {}) and value is not _MISSING and value not in values:
+                values.append(value)
+        return values
+
+    def aggregate(self, pipeline):
+        # Just the {"$group": {"_id": "$field", name: {"$max": "$field"}}}
+        # shape backfill_marker_seq uses
+        (stage,) = pipeline
+        group = dict(stage["$group"])
+        key = group.pop("_id")[1:]
+        ((name, spec),) = group.items()
+        field = spec["$max"][1:]
+        rows = {}
+        for doc in self.docs:
+            value = doc.get(field)
+            row = rows.setdefault(doc.get(key), {"_id": doc.get(key), name: None})
+            if value is not None and (row[name] is None or value > row[name]):
+                row[name] = value
+        return FakeCursor(list(rows.values()))
+
+    async def index_information(self):
+        return dict(self.indexes)
+
+    async def drop_index(self, name):
+        if name not in self.indexes:
+            raise OperationFailure(f"index not found with name [{name}]")
+        del self.indexes[name]
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
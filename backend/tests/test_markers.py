@@ -0,0 +1,86 @@
+"""Scene marker endpoint tests against the in-memory Mongo fake."""
+
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from app.models import SCENE_MARKERS_COLLECTION, VIDEOS_COLLECTION
+from app.routers import markers, ws
+from tests.fakes import FakeCollection, FakeDB
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(ws, "get_database", lambda: db)
+    return db
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(markers.router)
+    app.include_router(ws.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+@pytest.fixture
+def video_id(db):
+    vid = uuid.uuid4()
+    db[VIDEOS_COLLECTION] = FakeCollection([{
+        "_id": vid, "status": "recording", "s3_key": "k", "upload_id": "u",
+    }])
+    return vid
+
+
+def test_websocket_markers_list_like_rest_markers(client, video_id):
+    with client.websocket_connect(f"/ws/upload/{video_id}") as conn:
+        conn.send_text('{"action": "marker", "timestamp": 2, "label": null}')
+        assert conn.receive_json() == {
+            "event": "marker_ack", "timestamp": 2.0, "label": "Scene change",
+        }
+        conn.send_text('{"action": "marker", "timestamp": "soon"}')
+        assert conn.receive_json() == {"error": "Invalid marker"}
+    client.post(
+        "/markers/", json={"video_id": str(video_id), "timestamp": 1, "label": "Intro"}
+    )
+
+    listed = client.get(f"/markers/video/{video_id}").json()
+    assert [(m["timestamp"], m["label"], m["order"]) for m in listed] == [
+        (1.0, "Intro", 1),
+        (2.0, "Scene change", 0),
+    ]
+    assert all(isinstance(m["timestamp"], float) for m in listed)
+
+
+def test_unvalidated_stored_markers_are_coerced_on_list(client, db, video_id):
+    # Written by the WebSocket handler before it validated markers
+    db[SCENE_MARKERS_COLLECTION].docs.append({
+        "_id": "m1", "video_id": video_id, "timestamp": 3, "label": None,
+        "created_at": datetime.now(timezone.utc),
+    })
+
+    (marker,) = client.get(f"/markers/video/{video_id}").json()
+    assert marker["timestamp"] == 3.0 and isinstance(marker["timestamp"], float)
+    assert marker["label"] == "Scene change"
+
+
+def test_batch_create_returns_markers_in_order(client, video_id):
+    response = client.post("/markers/batch", json={
+        "video_id": str(video_id),
+        "markers": [
+            {"video_id": str(video_id), "timestamp": 4, "label": "b"},
+            {"video_id": str(video_id), "timestamp": 1, "label": "a"},
+        ],
+    })
+
+    assert response.status_code == 201
+    assert [(m["label"], m["order"], m["timestamp"]) for m in response.json()] == [
+        ("b", 0, 4.0),
+        ("a", 1, 1.0),
+    ]
@@ -0,0 +1,103 @@
+"""Data migration tests against the in-memory Mongo fake."""
+
+import asyncio
+import uuid
+
+from app import migrations
+from app.models import ANNOTATIONS_COLLECTION, SCENE_MARKERS_COLLECTION, VIDEOS_COLLECTION
+from tests.fakes import FakeCollection, FakeDB
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_string_ids_are_rekeyed_with_their_references():
+    vid = uuid.uuid4()
+    db = FakeDB()
+    db[VIDEOS_COLLECTION] = FakeCollection([{
+        "_id": str(vid), "status": "ready", "s3_key": "k",
+        "marker_seq": 2, "parts": {"1": "e1"},
+    }])
+    db[VIDEOS_COLLECTION].indexes["s3_key_1"] = {"unique": True}
+    db[ANNOTATIONS_COLLECTION] = FakeCollection([{"_id": "a", "video_id": str(vid)}])
+    db[SCENE_MARKERS_COLLECTION] = FakeCollection([
+        {"_id": "m1", "video_id": str(vid), "order": 0},
+        {"_id": "m2", "video_id": str(vid), "order": 1},
+    ])
+
+    _run(migrations.convert_string_ids(db))
+
+    (video,) = db[VIDEOS_COLLECTION].docs
+    assert video == {
+        "_id": vid, "status": "ready", "s3_key": "k",
+        "marker_seq": 2, "parts": {"1": "e1"},
+    }
+    # Dropped so the copy can coexist with the original; startup recreates it
+    assert "s3_key_1" not in db[VIDEOS_COLLECTION].indexes
+    assert [a["video_id"] for a in db[ANNOTATIONS_COLLECTION].docs] == [vid]
+    assert [m["video_id"] for m in db[SCENE_MARKERS_COLLECTION].docs] == [vid, vid]
+
+
+def test_non_uuid_ids_are_left_alone():
+    db = FakeDB()
+    db[VIDEOS_COLLECTION] = FakeCollection([{"_id": "not-a-uuid", "status": "ready"}])
+    db[SCENE_MARKERS_COLLECTION] = FakeCollection([{"_id": "m", "video_id": "not-a-uuid"}])
+
+    _run(migrations.convert_string_ids(db))
+
+    assert [v["_id"] for v in db[VIDEOS_COLLECTION].docs] == ["not-a-uuid"]
+    assert [m["video_id"] for m in db[SCENE_MARKERS_COLLECTION].docs] == ["not-a-uuid"]
+
+
+def test_interrupted_conversion_resumes():
+    # A previous run inserted the UUID copy but died before deleting the
+    # string-keyed original
+    vid = uuid.uuid4()
+    db = FakeDB()
+    db[VIDEOS_COLLECTION] = FakeCollection([
+        {"_id": vid, "title": "copy"},
+        {"_id": str(vid), "title": "copy"},
+    ])
+
+    _run(migrations.convert_string_ids(db))
+
+    assert db[VIDEOS_COLLECTION].docs == [{"_id": vid, "title": "copy"}]
+
+
+def test_marker_seq_is_backfilled_without_lowering_counters():
+    behind, ahead, empty = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    db = FakeDB()
+    db[VIDEOS_COLLECTION] = FakeCollection([
+        {"_id": behind},
+        {"_id": ahead, "marker_seq": 10},
+        {"_id": empty},
+    ])
+    db[SCENE_MARKERS_COLLECTION] = FakeCollection([
+        {"_id": 1, "video_id": behind, "order": 0},
+        {"_id": 2, "video_id": behind, "order": 4},
+        {"_id": 3, "video_id": ahead, "order": 2},
+    ])
+
+    _run(migrations.backfill_marker_seq(db))
+
+    seqs = {v["_id"]: v.get("marker_seq") for v in db[VIDEOS_COLLECTION].docs}
+    assert seqs == {behind: 5, ahead: 10, empty: None}
+
+
+def test_run_migrations_applies_each_step_once(monkeypatch):
+    calls = []
+
+    async def step(db):
+        calls.append(len(calls))
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [("first", step), ("second", step)])
+    db = FakeDB()
+    db[migrations.MIGRATIONS_COLLECTION] = FakeCollection([{"_id": "first"}])
+
+    assert _run(migrations.run_migrations(db)) == ["second"]
+    assert _run(migrations.run_migrations(db)) == []
+    assert calls == [0]
+    assert [m["_id"] for m in db[migrations.MIGRATIONS_COLLECTION].docs] == [
+        "first", "second",
+    ]
@@ -0,0 +1,50 @@
+"""S3 thread-pool helper tests; boto3 is never called."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app import s3
+
+
+def test_cancelled_part_uploads_keep_their_slots(monkeypatch):
+    release = threading.Event()
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+
+    def upload():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        release.wait(5)
+        with lock:
+            running -= 1
+        return "etag"
+
+    async def scenario():
+        monkeypatch.setattr(s3, "_part_slots", asyncio.Semaphore(2))
+        first = [asyncio.create_task(s3.run_s3_part(upload)) for _ in range(2)]
+        while running < 2:
+            await asyncio.sleep(0.01)
+        for task in first:
+            task.cancel()
+        await asyncio.gather(*first, return_exceptions=True)
+
+        # Both cancelled uploads are still on their threads, so these wait
+        second = [asyncio.create_task(s3.run_s3_part(upload)) for _ in range(2)]
+        await asyncio.sleep(0.1)
+        assert running == 2
+
+        release.set()
+        return await asyncio.gather(*second)
+
+    executor = ThreadPoolExecutor(max_workers=8)
+    monkeypatch.setattr(s3, "_executor", executor)
+    try:
+        assert asyncio.run(scenario()) == ["etag", "etag"]
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+    assert peak == 2
@@ -0,0 +1,78 @@
+"""Video router tests against the in-memory Mongo fake; S3 is stubbed."""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models import VIDEOS_COLLECTION
+from app.routers import video
+from tests.fakes import FakeCollection, FakeDB
+
+TIMEOUT = timedelta(hours=6)
+
+
+@pytest.fixture
+def aborted(monkeypatch):
+    calls = []
+    monkeypatch.setattr(video, "abort_upload", lambda key, upload_id: calls.append(key))
+    return calls
+
+
+def _recording(key, **fields):
+    return {
+        "_id": uuid.uuid4(), "status": "recording", "s3_key": key, "upload_id": "u",
+        **fields,
+    }
+
+
+def _status(db):
+    return {v["s3_key"]: v["status"] for v in db[VIDEOS_COLLECTION].docs}
+
+
+def test_only_idle_recordings_are_swept(aborted):
+    now = datetime.now(timezone.utc)
+    long_ago = now - TIMEOUT - timedelta(minutes=1)
+    db = FakeDB()
+    db[VIDEOS_COLLECTION] = FakeCollection([
+        _recording("idle", created_at=long_ago, last_activity_at=long_ago),
+        # Started long ago, but still streaming: the bug this sweep had
+        _recording("active", created_at=long_ago, last_activity_at=now),
+        # Written before last_activity_at existed; judged by created_at
+        _recording("legacy-old", created_at=long_ago),
+        _recording("legacy-new", created_at=now),
+    ])
+
+    assert asyncio.run(video.abort_stale_uploads(db, TIMEOUT)) == 2
+
+    assert _status(db) == {
+        "idle": "cancelled",
+        "active": "recording",
+        "legacy-old": "cancelled",
+        "legacy-new": "recording",
+    }
+    assert sorted(aborted) == ["idle", "legacy-old"]
+
+
+class ChunkDuringSweep(FakeCollection):
+    """A chunk lands on every recording right after the sweep's scan."""
+
+    def find(self, query=None, projection=None):
+        cursor = super().find(query, projection)
+        for doc in self.docs:
+            doc["last_activity_at"] = datetime.now(timezone.utc)
+        return cursor
+
+
+def test_recording_touched_after_the_scan_is_not_aborted(aborted):
+    long_ago = datetime.now(timezone.utc) - TIMEOUT - timedelta(minutes=1)
+    db = FakeDB()
+    db[VIDEOS_COLLECTION] = ChunkDuringSweep([
+        _recording("raced", created_at=long_ago, last_activity_at=long_ago),
+    ])
+
+    assert asyncio.run(video.abort_stale_uploads(db, TIMEOUT)) == 0
+
+    assert _status(db) == {"raced": "recording"}
+    assert aborted == []
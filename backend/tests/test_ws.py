@@ -0,0 +1,109 @@
+"""WebSocket ingestion tests, with S3 and Mongo replaced by in-memory fakes."""
+
+import asyncio
+import time
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import ws
+from tests.fakes import FakeCollection, FakeDB
+
+
+@pytest.fixture
+def video_id(monkeypatch):
+    vid = uuid.uuid4()
+    db = FakeDB()
+    db[ws.VIDEOS_COLLECTION] = FakeCollection([{
+        "_id": vid, "status": "recording", "s3_key": "k", "upload_id": "u",
+    }])
+    monkeypatch.setattr(ws, "get_database", lambda: db)
+    return vid
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(ws.router)
+    return TestClient(app)
+
+
+def test_part_is_acked_without_a_following_frame(client, video_id, monkeypatch):
+    def upload_chunk(s3_key, upload_id, part_number, data):
+        time.sleep(0.05)
+        return f"etag-{part_number}"
+
+    monkeypatch.setattr(ws, "upload_chunk", upload_chunk)
+
+    with client.websocket_connect(f"/ws/upload/{video_id}") as conn:
+        conn.send_bytes(b"chunk")
+        # Give the upload time to finish before any other frame is sent; the
+        # ack must not depend on the next frame arriving.
+        time.sleep(0.3)
+        conn.send_text('{"action": "ping"}')
+        assert conn.receive_json() == {"event": "chunk_ack", "part_numbers": [1]}
+        assert conn.receive_json() == {"event": "pong"}
+
+
+def _markers(video_id):
+    return ws.get_database()[ws.SCENE_MARKERS_COLLECTION].docs
+
+
+def test_non_object_payload_is_rejected_and_markers_survive(client, video_id):
+    with client.websocket_connect(f"/ws/upload/{video_id}") as conn:
+        conn.send_text('{"action": "marker", "timestamp": 1.5}')
+        assert conn.receive_json()["event"] == "marker_ack"
+        conn.send_text("[1]")
+        assert conn.receive_json() == {"error": "Invalid JSON"}
+
+    assert [m["timestamp"] for m in _markers(video_id)] == [1.5]
+
+
+def test_markers_are_saved_when_complete_fails(client, video_id, monkeypatch):
+    def complete_upload(s3_key, upload_id, parts):
+        raise RuntimeError("S3 unavailable")
+
+    monkeypatch.setattr(ws, "upload_chunk", lambda *args: "etag")
+    monkeypatch.setattr(ws, "complete_upload", complete_upload)
+
+    with pytest.raises(RuntimeError):
+        with client.websocket_connect(f"/ws/upload/{video_id}") as conn:
+            conn.send_text('{"action": "marker", "timestamp": 2}')
+            conn.receive_json()
+            conn.send_bytes(b"chunk")
+            conn.send_text('{"action": "complete", "duration": 3}')
+            conn.receive_json()
+
+    assert [m["timestamp"] for m in _markers(video_id)] == [2]
+
+
+def test_markers_from_separate_sessions_get_distinct_orders(client, video_id):
+    for timestamp in (1, 2):
+        with client.websocket_connect(f"/ws/upload/{video_id}") as conn:
+            conn.send_text('{"action": "marker", "timestamp": %d}' % timestamp)
+            conn.receive_json()
+
+    assert [m["order"] for m in _markers(video_id)] == [0, 1]
+
+
+def test_touch_bumps_last_activity_at_most_once_per_interval():
+    vid = uuid.uuid4()
+    db = FakeDB()
+    videos = db[ws.VIDEOS_COLLECTION] = FakeCollection([{"_id": vid}])
+    session = ws.UploadSession(
+        websocket=None, db=db, video_id=vid, s3_key="k", upload_id="u"
+    )
+
+    async def touch_twice():
+        await session.touch()
+        first = videos.docs[0]["last_activity_at"]
+        await session.touch()
+        assert videos.docs[0]["last_activity_at"] is first  # throttled
+
+        session.last_touch -= ws.ACTIVITY_TOUCH_INTERVAL
+        await session.touch()
+        assert videos.docs[0]["last_activity_at"] is not first
+
+    asyncio.run(touch_twice())
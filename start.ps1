@@ -19,6 +19,10 @@ if (-not (Test-Path $backendDir)) {
 Push-Location $backendDir
 
 try {
+    # Apply pending data migrations once, before any worker starts serving
+    python -m app.migrations
+    if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
+
     if ($dev) {
         uvicorn app.main:app --app-dir $backendDir --reload --host 0.0.0.0 --port 8000
     } else {
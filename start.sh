@@ -17,8 +17,15 @@ fi
 
 cd "$BACKEND_DIR"
 
+# Apply pending data migrations once, before any worker starts serving
+python -m app.migrations
+
+# uvloop + httptools ship with uvicorn[standard]; pin them so a missing
+# extra fails loudly instead of silently falling back to asyncio/h11.
+SERVER_OPTS=(--loop uvloop --http httptools --host 0.0.0.0 --port 8000)
+
 if [[ "$1" == "--dev" ]]; then
-  uvicorn app.main:app --app-dir "$BACKEND_DIR" --reload --host 0.0.0.0 --port 8000
+  uvicorn app.main:app --app-dir "$BACKEND_DIR" --reload "${SERVER_OPTS[@]}"
 else
-  uvicorn app.main:app --app-dir "$BACKEND_DIR" --host 0.0.0.0 --port 8000
+  uvicorn app.main:app --app-dir "$BACKEND_DIR" "${SERVER_OPTS[@]}"
 fi